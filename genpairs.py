@@ -59,32 +59,59 @@ usage = """Usage:
 #  A case is a list (array) with n columns
 #
 # Representations: 
-#    A test case is represented as a list, indexed by column (category)
-#    A test suite is a list of test cases
-#    An item is a tuple, and an itempair is a tuple
+#    Each item is given a small integer id while parsing; id 0 
+#      (DontCareId) stands for a slot not filled in yet. 
+#    A test case is represented as a list of item ids, indexed by 
+#      column (category)
+#    A test suite is a list of test cases; finished test cases are 
+#      stored as compact arrays of item ids (see SuiteRow)
+#    An obligation is a tuple of two item ids, the smaller id first, 
+#      and is also given a small integer pair id
 #
 #  Like AETG and several other covering array generators, the outer
 #  loop will generate test cases, and the inner loops try to fulfill
 #  as many test obligations as possible with each test case.
 #   
 # Data structures: 
-#   We will record obligations in three different data structures, 
-#   for different forms of quick access: 
-#  ObsList is a list of obligations, some of which may 
-#     already have been fulfilled (deletion is lazy). We may scramble 
-#     this list so we don't have an unfortunate ordering. 
-#  Outstanding is a set of all the obligations still outstanding.
-#  ObsByCol is a dictionary obligations by column, also updated lazily.
+#   Each obligation has a pair id (see PairIds), and we record 
+#   obligations in three different data structures, for different 
+#   forms of quick access: 
+#  Outstanding is a bytearray indexed by pair id, 1 for each 
+#     obligation still outstanding; its last byte (NoPair) stays 0.
+#  ObsByCol is a dictionary obligations by column, updated lazily.
+#     DeadByCol counts the fulfilled obligations left in each list, 
+#     and a list is compacted all at once when enough of it is dead.
+#  Seedable is a bytearray indexed by pair id, 1 for each outstanding 
+#     obligation we may still seed a test case with; like Outstanding, 
+#     its last byte (NoPair) stays 0. 
+#  For choosing seeds we also keep counts by item: 
+#  Degree counts, for each item id, the seedable obligations it is 
+#     part of, and ByDegree holds the set of item ids of each Degree. 
+#     Each test case is seeded from the densest item (see nextSeeds). 
 #  
-#  Exclude is a dictionary mapping items to lists of item.
+#  Excludes is a set of itempairs from the specification, each in 
+#     canonical order (see makePair), so it holds one direction only. 
+#  Exclusions is the same relation as a symmetric matrix indexed 
+#     by item ids (a list of bytearray rows), for quick access. 
+#  ExcludedBy holds, for each item id, the set of item ids it excludes. 
+#  Forbidden counts, for each item id, how many items of the test 
+#     case under construction exclude it. 
+#  Gain counts, for each item id, the outstanding obligations it 
+#     would meet with the items of the test case under construction. 
 #
 
 import sys    ## for file handling
 import random ## for shuffling lists 
 import csv    ## for reading and writing test suites 
+import re     ## for stripping comments from the specification
+import array  ## for compact storage of finished test cases
+from itertools import compress ## for picking out outstanding pairs
+import multiprocessing ## for building candidate cases in parallel (--jobs)
 
 ## Constants (other than tokens for parsing)
 DontCare = "_"
+DontCareId = 0  ## Item id of DontCare, excluded by nothing
+NoPair = -1     ## Pair id of two items that are not an obligation
 
 ## Configuration parameters
 DBG = False ## Debugging mode, on (true) or off (false)
@@ -103,8 +130,10 @@ logging.basicConfig(format='%(levelname)s:%(message)s',
                         level=logging.WARNING)
 Log = logging.getLogger(__name__)
 
-# Debug messages
+# Debug messages (formatted only if they will be logged)
 def dbg(*msg):
+    if not Log.isEnabledFor(logging.DEBUG): 
+        return
     parts = [ str(x) for x in msg ]
     msg_string = " ".join(parts)
     Log.debug(msg_string)
@@ -161,12 +190,15 @@ optparser.add_option("-p", "--pairs", "--print-pairs",
                      help="""Report pairs not covered by initial test suites.
                              (Useful only with --initial)""")
 
-(UserOptions, UserArgs) = optparser.parse_args()
-Log.info("User options: ",  UserOptions)
-if UserOptions.debug :
-    print_("Enabling debugging")
-    DBG=True
-    Log.setLevel(logging.DEBUG)
+optparser.add_option("-j", "--jobs", type="int", default=1, dest="jobs",
+                     help="""Build up to this many test cases at a time, 
+                             each in its own process.  Faster only with 
+                             at least that many CPUs; the suite is often 
+                             a little larger than with one at a time.""")
+
+## Set by main() from the command line
+UserOptions = None
+UserArgs = [ ]
 
 
 ## Primary data structures
@@ -174,11 +206,32 @@ CategoriesList = [ ]    ## List of category names (in order given)
      ## The CategoriesList can also be considered the test case schema
 CategoriesValues = [ ]  ## List of value sets
 Singles = [] ## List of (slot,value,kind) where kind is "single" or "error"
-Excludes = set()  ## Set of ((slot,value),(slot,value)) (not symmetric)
-
-ObsList = [ ]       # All obligations, but only one direction 
-Outstanding = set() # All obligations, but only one direction 
-ObsByCol = {}       # Per column, both directions 
+Excludes = set()  ## Set of ((slot,value),(slot,value)), lower slot first
+
+ItemIds = { }              ## Map (slot,value) pair to its item id
+ItemSlots = [ -1 ]         ## Slot of each item id
+ItemValues = [ DontCare ]  ## Value of each item id
+ColumnItems = [ ] ## Per slot, item ids of its (non-single) values
+Exclusions = [ ]  ## Exclusions[a][b] is 1 if items a and b exclude each other
+ExcludedBy = [ ]  ## Frozenset of item ids excluded by each item id
+Forbidden = [ ]   ## Per item id, excluding items in the current test case
+Gain = [ ]        ## Per item id, obligations met with the current test case
+TestCase = [ ]    ## The test case under construction (see NewCase)
+EmptyCase = [ ]   ## All DontCare, to clear TestCase with
+NoCounts = [ ]    ## All 0 per item id, to clear Forbidden and Gain with
+
+PairIds = [ ]       # PairIds[a][b] is the pair id of items a, b, or NoPair
+PairItems = [ ]     # The obligation (item, item) for each pair id
+
+Seedable = bytearray()  # Per pair id, outstanding and not given up as a seed
+Degree = [ ]        # Per item id, seedable obligations it is part of
+ByDegree = [ ]      # Per degree, the set of item ids with that Degree
+MaxDegree = 0       # No item has a higher Degree
+Partner = [ ]       # Per item id, item of its densest seedable obligation
+PartnerDegree = [ ] # Per item id, Degree of its Partner when it was chosen
+Outstanding = bytearray() # Per pair id; the last byte (NoPair) stays 0
+ObsByCol = {}       # Per column, by pair id
+DeadByCol = [ ]     # Per column, fulfilled obligations still in ObsByCol
 
 SingleColumns =   [ ] # Columns with just one (non-error, non-single) choice
 MultipleColumns = [ ] # Complement of SingleColumns -- pairs are from these
@@ -223,82 +276,97 @@ def tokenClass( tok ) :
     if tok == "error" : return ErrorToken
     return ValueToken
 
-# Generator to produce tokens, one by one
+# The whole specification is read and split into tokens up front; 
+# comments run from "//" to the end of the line.  The parser then 
+# steps through the list, and stays on EOF once it gets there. 
 # 
-def getToken() : 
-    while 1:
-        s = sys.stdin.readline()
-        if not s: 
+Comment = re.compile(r"//[^\n]*")
+
+Tokens = [ ]
+TokenPos = 0   # Index in Tokens of the token nextToken() returns
+
+def readTokens() : 
+    text = sys.stdin.read()
+    Tokens.extend( Comment.sub("", text).split() )
+    Tokens.append( EOF )
+
+def nextToken() : 
+    global TokenPos
+    tok = Tokens[ TokenPos ]
+    if TokenPos < len(Tokens) - 1 : 
+        TokenPos = TokenPos + 1
+    if DBG : 
+        if tok == EOF : 
             dbg("#DBG <<EOF reached>>")
-            yield EOF
-            return
-        commentPos = s.find("//");
-        if commentPos >= 0 : 
-            s = s[0:commentPos]
-        for word in s.split() : 
-               dbg("#DBG <<%s: %s>>" % ( word, tokenClass(word)  ) )
-               yield word
+        else : 
+            dbg("#DBG <<%s: %s>>" % ( tok, tokenClass(tok)  ) )
+    return tok
 
 Token = "UNINITIALIZED"
-tokenStream = getToken()
 
 def parse(): 
     global Token
     global NCol 
-    Token = six.next(tokenStream)
+    readTokens()
+    Token = nextToken()
     parseSpec()
     NCol = len(CategoriesList) 
+    for slot in range(NCol) : 
+        ColumnItems.append( 
+            tuple( [ ItemIds[ (slot, val) ] for val in CategoriesValues[slot] ] ) )
 
 def parseSpec(): 
     global Token
-    dbg("#DBG (parseSpec)")
-    if Token == EOF : return [ ]
-    if tokenClass( Token ) != CategoryToken : 
-        print_("Syntax error on ", Token, " looking for 'category:'")
-        print_("Skipping to next category")
-        ## Error recovery to next category
-        while tokenClass( Token ) != CategoryToken : 
-            if tokenClass( Token ) == EOF : 
-                print_("Discarding rest of file")
-                return [ ] 
-            Token = tokenStream.next()
-        print_("Resuming from" , Token)
-    category = Token[0:-1]
-    Token = six.next(tokenStream)
-    values = parseValues()
-    dbg("#DBG Parsed: ", category, " ::= ", values)
-    slotNum = len(CategoriesList)
-    CategoriesList.append( category ) 
-    vlist = [ ] 
-    CategoriesValues.append(vlist)
-    CategoriesProps[ category ] = [ ] 
-    for valDesc in values : 
-        val = valDesc[0] ## The name of the value itself
-        ## Postpone marking val as a possible value of the property
-        ## until we know whether it is a singleton 
-        singleton = False
-        ValueProps[ (slotNum, val) ] = [] ## List of its properties
-        for cond in valDesc[1:] : 
-            kind = nameOf(cond)
-            condVal = valOf(cond)
-            if kind == "prop" : 
-                CategoriesProps[ category ].append(condVal)
-                ValueProps[ (slotNum, val ) ].append(condVal)
-                if condVal not in PropsSlots : 
-                    PropsSlots[condVal] = set()
-                PropsSlots[condVal].add(slotNum) 
-            elif kind == "if" : 
-                ValueIfs.append( (val, slotNum, condVal ) ) 
-            elif kind == "except" : 
-                ValueExcepts.append( (val, slotNum, condVal) ) 
-            elif kind == "error" or kind == "single" : 
-                Singles.append( (val, slotNum, kind) ) 
-                singleton = True
-            else : 
-                print_("*ERR* Unrecognized condition attribute:", cond)
-        if not singleton:  vlist.append( val )
-
-    parseSpec()
+    while Token != EOF : 
+        dbg("#DBG (parseSpec)")
+        if tokenClass( Token ) != CategoryToken : 
+            print_("Syntax error on ", Token, " looking for 'category:'")
+            print_("Skipping to next category")
+            ## Error recovery to next category
+            while tokenClass( Token ) != CategoryToken : 
+                if tokenClass( Token ) == EOF : 
+                    print_("Discarding rest of file")
+                    return
+                Token = nextToken()
+            print_("Resuming from" , Token)
+        category = Token[0:-1]
+        Token = nextToken()
+        values = parseValues()
+        dbg("#DBG Parsed: ", category, " ::= ", values)
+        slotNum = len(CategoriesList)
+        CategoriesList.append( category ) 
+        vlist = [ ] 
+        CategoriesValues.append(vlist)
+        CategoriesProps[ category ] = [ ] 
+        for valDesc in values : 
+            val = valDesc[0] ## The name of the value itself
+            ## Postpone marking val as a possible value of the property
+            ## until we know whether it is a singleton 
+            singleton = False
+            ValueProps[ (slotNum, val) ] = [] ## List of its properties
+            if (slotNum, val) not in ItemIds : 
+                ItemIds[ (slotNum, val) ] = len(ItemValues)
+                ItemSlots.append( slotNum )
+                ItemValues.append( val )
+            for cond in valDesc[1:] : 
+                kind = nameOf(cond)
+                condVal = valOf(cond)
+                if kind == "prop" : 
+                    CategoriesProps[ category ].append(condVal)
+                    ValueProps[ (slotNum, val ) ].append(condVal)
+                    if condVal not in PropsSlots : 
+                        PropsSlots[condVal] = set()
+                    PropsSlots[condVal].add(slotNum) 
+                elif kind == "if" : 
+                    ValueIfs.append( (val, slotNum, condVal ) ) 
+                elif kind == "except" : 
+                    ValueExcepts.append( (val, slotNum, condVal) ) 
+                elif kind == "error" or kind == "single" : 
+                    Singles.append( (val, slotNum, kind) ) 
+                    singleton = True
+                else : 
+                    print_("*ERR* Unrecognized condition attribute:", cond)
+            if not singleton:  vlist.append( val )
 
 
 def parseValues(): 
@@ -318,7 +386,7 @@ def parseValue():
         print_("Syntax error, expecting value, saw ", Token )
         return [ "--bogus--"] 
     value = [ Token ]
-    Token = six.next(tokenStream)
+    Token = nextToken()
     conditions = parseConditions()
     dbg("#DBG parseValue returns", value + conditions)
     return value + conditions 
@@ -327,25 +395,25 @@ def parseConditions():
     global Token 
     dbg("#DBG (parseConditions)")
     if tokenClass( Token ) == ErrorToken : 
-        Token = six.next(tokenStream)
+        Token = nextToken()
         return [("error", None )] + parseConditions()
     if tokenClass( Token ) == SingleToken : 
-        Token = six.next(tokenStream)
+        Token = nextToken()
         return [("single", None)] + parseConditions()
     if tokenClass( Token ) == IfToken : 
-        Token = six.next(tokenStream) 
+        Token = nextToken() 
         ifcond = Token
-        Token = six.next(tokenStream)
+        Token = nextToken()
         return [("if" , ifcond)] + parseConditions()
     if tokenClass( Token ) == PropToken : 
-        Token = six.next(tokenStream) 
+        Token = nextToken() 
         condname = Token
-        Token = six.next(tokenStream)
+        Token = nextToken()
         return [("prop" , condname)] + parseConditions()
     if tokenClass( Token ) == ExceptToken : 
-        Token = six.next(tokenStream) 
+        Token = nextToken() 
         condname = Token
-        Token = six.next(tokenStream)
+        Token = nextToken()
         return [("except" , condname)] + parseConditions()
     dbg("#DBG No more conditions")
     return [ ]
@@ -353,12 +421,14 @@ def parseConditions():
 
 # -------------- The form of a pair (obligation or exclusion) -----
 
+# Pairs are kept in canonical order, lower slot first (and lower 
+# value first within a slot), so that a pair and its reverse are 
+# the same pair and one lookup is enough. 
 def makePair( s1, v1, s2, v2 ): 
+    if s1 > s2 or (s1 == s2 and v1 > v2) : 
+        return ((s2, v2), (s1, v1))
     return ((s1, v1), (s2, v2)) 
 
-def reversePair( pair ): 
-    return ( pair[1], pair[0] )
-
 # Each item in the pair is a <slot,value> or <name,value> pair
 def slotOf( tuple ): 
     return tuple[0]
@@ -411,189 +481,472 @@ def makeExcludes() :
             for cs_value in CategoriesValues[ conflict_slot ] : 
                 if cond not in ValueProps[ (conflict_slot, cs_value) ] : 
                     Excludes.add( makePair( slot, val, conflict_slot, cs_value))
+    # The same relation, by item id and in both directions.  
+    # A value can never share a slot with another, so exclusions
+    # within a slot carry no information and are left out. 
+    nitems = len(ItemValues)
+    excluded = [ ]
+    for i in range(nitems) : 
+        Exclusions.append( bytearray(nitems) )
+        excluded.append( set() )
+    for ((s1, v1), (s2, v2)) in Excludes : 
+        if s1 != s2 : 
+            a = ItemIds[ (s1, v1) ]
+            b = ItemIds[ (s2, v2) ]
+            Exclusions[a][b] = 1
+            Exclusions[b][a] = 1
+            excluded[a].add(b)
+            excluded[b].add(a)
+    for items in excluded : 
+        ExcludedBy.append( frozenset(items) )
 
 
 def makeObligations() : 
+   global MaxDegree
    if DBG:
        print_("--- Creating obligations list ---")
    keys = CategoriesList
    nslots = len(keys)
    for i in range(nslots): 
        ObsByCol[i] = []
+       DeadByCol.append(0)
+   nitems = len(ItemValues)
+   for i in range(nitems): 
+       PairIds.append( [ NoPair ] * nitems )
    for i in MultipleColumns : 
-       for v1 in CategoriesValues[i] : 
-           i_item = (i, v1)
+       for i_item in ColumnItems[i] : 
+           excluded = Exclusions[ i_item ]
            for j in range(i+1,nslots) : 
                ## if j in SingleColumns: continue ## 
                ##  --- short cut doesn't work if only one varying column -- 
-               for v2 in CategoriesValues[j] : 
-                   j_item = (j, v2)
-                   obforward = (i_item, j_item)
-                   obbackward = (j_item, i_item)
-                   if obforward not in Excludes and obbackward not in Excludes: 
-                       ObsList.append(obforward)
-                       Outstanding.add(obforward)
-                       ObsByCol[ i ].append(obforward)
-                       ObsByCol[ j ].append(obbackward)
-   random.shuffle(ObsList)
-   dbg("--- ObsList complete, ", len(ObsList), " obligations  ---")
+               for j_item in ColumnItems[j] : 
+                   ## A value listed twice in a category is still 
+                   ## one obligation, under its first pair id
+                   if ( not excluded[ j_item ] and 
+                        PairIds[ i_item ][ j_item ] == NoPair ) : 
+                       pair = len(PairItems)
+                       PairItems.append( (i_item, j_item) )
+                       PairIds[ i_item ][ j_item ] = pair
+                       PairIds[ j_item ][ i_item ] = pair
+                       ObsByCol[ i ].append(pair)
+                       ObsByCol[ j ].append(pair)
+   Outstanding.extend( bytearray([1]) * len(PairItems) )
+   Outstanding.append( 0 )  ## Outstanding[NoPair]
+   Seedable.extend( Outstanding )
+   Degree.extend( [ 0 ] * nitems )
+   for (k1, k2) in PairItems : 
+       Degree[k1] += 1
+       Degree[k2] += 1
+   MaxDegree = max( Degree )
+   ByDegree.extend( [ set() for d in range( MaxDegree + 1 ) ] )
+   for item in range( nitems ) : 
+       ByDegree[ Degree[item] ].add( item )
+   Partner.extend( [ DontCareId ] * nitems )
+   PartnerDegree.extend( [ 0 ] * nitems )
+   dbg("--- Obligations complete, ", len(PairItems), " obligations  ---")
 
 #  When we complete a test case, we remove obligations from
 #  the outstanding obligations list.  The other lists are 
 #  cleared lazily, when we bring up an obligation. 
+#  Pair ids are gathered a row of PairIds at a time, so the 
+#  only per-pair work left in Python is the Outstanding test. 
 #
-def clearObligations(testcase) : 
-    testCaseValue = 0
+def metObligations(testcase) : 
+    pairs = [ ]
     for i in range( len(testcase) ): 
-        for j in range ( i+1, len(testcase) ): 
-            ob = makePair(i, testcase[i], j, testcase[j]) 
-            if ob in Outstanding: 
-                Outstanding.remove(ob)
-                testCaseValue = testCaseValue + 1
+        row = PairIds[ testcase[i] ]
+        pairs.extend( map( row.__getitem__, testcase[i+1:] ) )
+    return [ ob for ob in pairs if Outstanding[ob] ]
+
+#  Every obligation a test case meets is between two of its items, 
+#  so the counts per column and per item are brought up to date an 
+#  item at a time, with the pair ids of its row in the test case. 
+def clearObligations(testcase) : 
+    met = metObligations(testcase)
+    for slot in range( len(testcase) ): 
+        item = testcase[slot]
+        pairs = list( map( PairIds[item].__getitem__, testcase ) )
+        DeadByCol[slot] += sum( map( Outstanding.__getitem__, pairs ) )
+        seeds = sum( map( Seedable.__getitem__, pairs ) )
+        if seeds > 0 : 
+            lowerDegree( item, seeds )
+    for ob in met : 
+        Outstanding[ob] = 0
+        Seedable[ob] = 0
+    testCaseValue = len(met)
     dbg("*** Value ", testCaseValue, testcase )
+    return met
+
+def dropObligation( ob ) : 
+    Outstanding[ob] = 0
+    (k1, k2) = PairItems[ob]
+    DeadByCol[ ItemSlots[k1] ] += 1
+    DeadByCol[ ItemSlots[k2] ] += 1
+    if Seedable[ob] : 
+        unseed( ob )
+
+## No more test cases will be seeded with ob 
+def unseed( ob ) : 
+    Seedable[ob] = 0
+    for k in PairItems[ob] : 
+        lowerDegree( k, 1 )
+
+def lowerDegree( item, by ) : 
+    ByDegree[ Degree[item] ].remove( item )
+    Degree[item] -= by
+    ByDegree[ Degree[item] ].add( item )
 
 
 # ---------------------------------------------------------
 
 #
-# Is a given (slot,value) pair compatible with the test case so far? 
+# Put an item in a slot of the test case, keeping Forbidden and 
+# Gain up to date.  Returns the item it replaced, so that 
+# setSlot(testcase, slot, old) rolls the change back. 
+# Outstanding does not change while a case is being built, so Gain 
+# only moves for the partners of the items going in and out. 
 # 
-def compatible( item, testcase ) : 
-    slot, val = item 
-    if ( testcase[ slot ] != DontCare and testcase[slot] != val) : 
-        return False
-    for tslot in range(len(testcase)) : 
-        if ((slot, val), (tslot, testcase[tslot])) in Excludes: 
-            return False
-        if ((tslot, testcase[tslot]),(slot,val)) in Excludes: 
-            return False
-    return True
+def setSlot( testcase, slot, item ) : 
+    old = testcase[ slot ]
+    if old != item : 
+        for k in ExcludedBy[ old ] : 
+            Forbidden[k] = Forbidden[k] - 1
+        for k in ExcludedBy[ item ] : 
+            Forbidden[k] = Forbidden[k] + 1
+        if old != DontCareId : 
+            for k in compress( range(len(Gain)), 
+                               map( Outstanding.__getitem__, PairIds[old] ) ) : 
+                Gain[k] = Gain[k] - 1
+        if item != DontCareId : 
+            for k in compress( range(len(Gain)), 
+                               map( Outstanding.__getitem__, PairIds[item] ) ) : 
+                Gain[k] = Gain[k] + 1
+        testcase[ slot ] = item
+    return old
 
 # ---------------------------------------------------------
 
+def permutation ( n ): 
+   """The numbers 0..n-1 in random order"""
+   perm = list(range(n))
+   random.shuffle(perm)
+   return perm
+
 def MakeTuple ( len ): 
    newList = []
    for i in range(0,len): 
-      newList.append(DontCare)
+      newList.append(DontCareId)
    return newList
 
+def SuiteRow ( testcase ): 
+   """Finished test case as an array of item ids, 2 bytes per slot 
+   unless there are too many items for that.  The case under 
+   construction stays a list: CPython reads list elements faster."""
+   if len(ItemValues) <= 0xFFFF : 
+      return array.array( "H", testcase )
+   return array.array( "L", testcase )
+
+def NewCase ( ): 
+   """The test case under construction, emptied to be filled in 
+   with setSlot.  There is just the one: SuiteRow copies finished 
+   cases out, so each case can start over in the same lists."""
+   if len(EmptyCase) != NCol or len(NoCounts) != len(ItemValues) : 
+      EmptyCase[:] = MakeTuple( NCol )
+      NoCounts[:] = [ 0 ] * len(ItemValues)
+   TestCase[:] = EmptyCase
+   Forbidden[:] = NoCounts
+   Gain[:] = NoCounts
+   return TestCase
+
 
+#
+# Seeds for test cases come from the densest items, those with the 
+# highest Degree, taken at random among equals, and each one is 
+# paired with its densest partner, so the obligations that are 
+# hardest to pack into few test cases go first.  Degrees only go 
+# down, so a Partner is still the densest as long as its Degree has 
+# not changed; only then do we look through the whole row again. 
+#
+def nextSeeds( n ): 
+    """Up to n different seedable obligations, densest first"""
+    global MaxDegree
+    while MaxDegree > 0 and len( ByDegree[MaxDegree] ) == 0 : 
+        MaxDegree -= 1
+    seeds = [ ]
+    degree = MaxDegree
+    while degree > 0 and len(seeds) < n : 
+        items = list( ByDegree[degree] )
+        while len(items) > 0 and len(seeds) < n : 
+            a = items.pop( random.randrange( len(items) ) )
+            ob = PairIds[a][ bestPartner( a ) ]
+            if ob not in seeds : 
+                seeds.append( ob )
+        degree -= 1
+    return seeds
+
+def bestPartner( a ): 
+    row = PairIds[a]
+    b = Partner[a]
+    if Seedable[ row[b] ] and Degree[b] == PartnerDegree[a] : 
+        return b
+    b = max( compress( range(len(Degree)), map( Seedable.__getitem__, row ) ), 
+             key=Degree.__getitem__ )
+    Partner[a] = b
+    PartnerDegree[a] = Degree[b]
+    return b
+
+#
+# Create one test case around the next seed.  Returns False when 
+# there are no seedable obligations left.  If the seed cannot be 
+# part of any test case, we give up seeding with it, but it stays 
+# outstanding. 
+#
 def CreateCase(): 
-    seedObligation = ObsList.pop() 
-    while seedObligation not in Outstanding: 
-        if (len(ObsList) == 0): return
-        seedObligation = ObsList.pop() 
-    s1, v1 = seedObligation[0]
-    s2, v2 = seedObligation[1]
-    testcase = MakeTuple( len(CategoriesList) ) 
-    testcase[s1] = v1
-    testcase[s2] = v2
-    for slot in SingleColumns : 
-        testcase[slot] = CategoriesValues[slot][0]
-    dbg("#DBG === Attempting tuple seeded with", testcase)
-    columnOrder = list(range( len(CategoriesList) ) )
-    random.shuffle(columnOrder)
-    if ( completeCase( columnOrder, testcase ) ) : 
-        Suite.append( testcase )
+    seeds = nextSeeds( 1 )
+    if len(seeds) == 0 : 
+        return False
+    seedObligation = seeds[0]
+    ok, testcase = SeededCase( seedObligation )
+    if ( ok ) : 
+        Suite.append( SuiteRow( testcase ) )
         clearObligations( testcase )
     else: 
         CaseMessage( "Warning - No pair possible: ", testcase ) 
+        unseed( seedObligation )
+    return True
+
+# Try to build a test case around a seed obligation.  Returns 
+# (ok, testcase), where testcase is only partly filled in if not ok. 
+def SeededCase( seedObligation ): 
+    k1, k2 = PairItems[seedObligation]
+    testcase = NewCase() 
+    setSlot( testcase, ItemSlots[k1], k1 )
+    setSlot( testcase, ItemSlots[k2], k2 )
+    for slot in SingleColumns : 
+        setSlot( testcase, slot, ColumnItems[slot][0] )
+    dbg("#DBG === Attempting tuple seeded with", testcase)
+    columnOrder = permutation( len(CategoriesList) )
+    return ( completeCase( columnOrder, testcase ), testcase )
 	
+#
+# With --jobs N, each round builds up to N test cases at once, from 
+# N different seed obligations, each in its own worker process.  The 
+# workers are forked once the obligations are built, so they start 
+# out with the same tables.  After that each one is sent, with its 
+# seed, just the obligations fulfilled since the round before, and 
+# a random seed drawn here so that runs can still be repeated.  Cases 
+# built side by side may cover the same obligations, so we keep them 
+# best first, scoring the rest again after each one we keep, for as 
+# long as they fulfill something new. 
+#
+def caseWorker( conn ): 
+    """Build test cases as asked over conn, until told to stop"""
+    while True : 
+        task = conn.recv()
+        if task is None : 
+            break
+        (cleared, seedObligation, randomSeed) = task
+        for ob in cleared : 
+            dropObligation( ob )
+        if seedObligation is None : 
+            conn.send( None )
+            continue
+        random.seed( randomSeed )
+        conn.send( SeededCase( seedObligation ) )
+
+def CreateCasesInParallel( jobs ): 
+    try: 
+        if hasattr( multiprocessing, "get_context" ) : 
+            context = multiprocessing.get_context("fork")
+        else: 
+            context = multiprocessing
+    except ValueError: 
+        print_("Warning: --jobs needs fork(), building cases one at a time", 
+               file=sys.stderr)
+        while CreateCase() : 
+            pass
+        return
+    workers = [ ]
+    try: 
+        for i in range(jobs) : 
+            (conn, workerConn) = context.Pipe()
+            worker = context.Process( target=caseWorker, args=(workerConn,) )
+            worker.daemon = True
+            worker.start()
+            workers.append( (worker, conn) )
+        cleared = [ ]
+        while True : 
+            seeds = nextSeeds( jobs )
+            if len(seeds) == 0 : 
+                break
+            for i in range(jobs) : 
+                if i < len(seeds) : 
+                    task = (cleared, seeds[i], random.getrandbits(32))
+                else: 
+                    task = (cleared, None, None)
+                workers[i][1].send( task )
+            results = [ conn.recv() for (worker, conn) in workers ]
+            cleared = [ ]
+            cases = [ ]
+            for (ob, (ok, testcase)) in zip( seeds, results ) : 
+                if not ok : 
+                    CaseMessage( "Warning - No pair possible: ", testcase ) 
+                    unseed( ob )
+                    continue
+                cases.append( (len( metObligations( testcase ) ), testcase) )
+            while len(cases) > 0 : 
+                values = [ len( metObligations( testcase ) ) 
+                           for (value, testcase) in cases ]
+                best = values.index( max(values) )
+                (value, testcase) = cases.pop( best )
+                ## Not worth keeping if the cases kept already 
+                ## cover half of it; its seed can come up again
+                if 2 * values[best] < value : 
+                    break
+                Suite.append( SuiteRow( testcase ) )
+                cleared.extend( clearObligations( testcase ) )
+    finally: 
+        for (worker, conn) in workers : 
+            conn.send( None )
+        for (worker, conn) in workers : 
+            worker.join()
+
 def CreateSingles(): 
     for single in Singles: 
         CreateSingle(single)
 
 def CreateSingle( single ): 
-    testcase = MakeTuple( len(CategoriesList) ) 
-    columnOrder = list(range( len(CategoriesList) ) )
-    random.shuffle(columnOrder)
+    testcase = NewCase() 
+    columnOrder = permutation( len(CategoriesList) )
     value, slot,  kind = single
     dbg("#DBG single obligation: ",  slot, value, kind)
-    testcase[slot] = value
+    setSlot( testcase, slot, ItemIds[ (slot, value) ] )
     if completeCase( columnOrder, testcase ) : 
-        Suite.append( testcase )
+        Suite.append( SuiteRow( testcase ) )
     else: 
         CaseMessage( "Warning - No pair possible: ", testcase )
 
-
-def completeCase( columnOrder, testcase ) : 
-    if len (columnOrder) == 0 : 
-        dbg_p("#DBG: *** Success: ", testcase)
-        return True
-    dbg_p("#DBG * Attempting to complete", testcase )
-    col = columnOrder[0]
-    if testcase[col] != DontCare: 
-        dbg_p("#DBG *  Skipping column ", col, " (already filled in)")
-        return completeCase( columnOrder[1:], testcase )
-    dbg("#DBG ***Trying columns ", columnOrder, " in ",  testcase)
-
+#
+# Choices for filling column col of the test case, best first: 
+# first the compatible outstanding obligations involving col, 
+# as (item, item) pairs, then any compatible value for col on 
+# its own, as (item, item) with the same item twice. 
+#
+def columnChoices( col, testcase ) : 
     # How shall we fill this DontCare with something useful? 
     # Let's try for an outstanding obligation.
     # Dec 2006 --- Let's look at all the outstanding obligations
     #   and choose the one with highest score.  This is fairly expensive 
     # (10^20 takes about 9 minutes wall time on G4 laptop), so now we 
     # set a limit (maxCandidates) on number of candidates considered 
+    #
+    # An item is compatible with the test case if its slot is DontCare 
+    # or holds the item already, and nothing in the case excludes it 
+    # (Forbidden, which setSlot keeps up to date).  This scan is the 
+    # innermost loop of the whole search, so the tables it reads are 
+    # bound to local names and the test is written out for both items. 
     colObs = ObsByCol[col]
+    # Here is our lazy deletion of obligations: once a quarter of 
+    # the list is obligations already met, we filter them all out 
+    # in one pass.  Until then the scan just skips them. 
+    if 4 * DeadByCol[col] > len(colObs) : 
+        dbg_p("#DBG * Lazy deletion in column ", col)
+        colObs[:] = filter( Outstanding.__getitem__, colObs )
+        DeadByCol[col] = 0
+    outstanding = Outstanding
+    forbidden = Forbidden
+    gain = Gain
+    pairItems = PairItems
+    itemSlots = ItemSlots
+    # Each candidate is scored as it is found.  Gain says how many 
+    # outstanding obligations each item would meet with the test case 
+    # as it stands.  Note one (but not both) of the items of a candidate 
+    # may coincide with an existing element.  We'll only consider 
+    # *added* value, so an item already in the test case adds nothing. 
     candidates = [ ] 
-    obindex = 0
-    while obindex < len(colObs) and len(candidates) < maxCandidates : 
-        ob = colObs[obindex]
-        if not (ob in Outstanding or reversePair(ob) in Outstanding): 
-            # Here is our lazy deletion of obligations; we 
-            # clip from the end of the list
-            dbg_p("#DBG * Lazy deletion")
-            colObs[obindex] = colObs[ len(colObs) - 1 ]
-            colObs.pop()
-        else: 
-            if compatible(ob[0], testcase) and compatible(ob[1], testcase): 
-                dbg_p("#DBG *** Compatible", ob, testcase )
-                # Score the 
-                # Note one (but not both) of these may coincide with 
-                # an existing element.  We'll only consider *added* value, 
-                # so we score the *new* parts only. 
-                value = 1 ## For at least meeting one obligation
-                ((s1, v1), (s2, v2)) = ob 
-                if testcase[s1] != v1 : 
-                    for ccol in range( len(testcase) ): 
-                        if ((s1,v1),(ccol,testcase[ccol])) in Outstanding : 
-                            value = value + 1
-                        if ((ccol,testcase[ccol]),(s1,v1)) in Outstanding :
-                            value = value + 1
-                if testcase[s2] != v2 : 
-                    for ccol in range( len(testcase) ): 
-                        if ((s2,v2),(ccol,testcase[ccol])) in Outstanding : 
-                            value = value + 1
-                        if ((ccol,testcase[ccol]),(s2,v2)) in Outstanding :
-                            value = value + 1
-                candidates.append( (value, ob) ) 
-            obindex = obindex + 1
+    nfound = 0
+    for ob in colObs : 
+        if outstanding[ob]: 
+            (k1, k2) = pairItems[ob]
+            if not (forbidden[k1] or forbidden[k2]) : 
+                filled1 = testcase[ itemSlots[k1] ]
+                filled2 = testcase[ itemSlots[k2] ]
+                if ((filled1 == DontCareId or filled1 == k1) and 
+                    (filled2 == DontCareId or filled2 == k2)) : 
+                    if DBGp: dbg_p("#DBG *** Compatible", ob, testcase )
+                    ## 1 for at least meeting one obligation
+                    score = 1
+                    if filled1 == DontCareId : 
+                        score = score + gain[k1]
+                    if filled2 == DontCareId : 
+                        score = score + gain[k2]
+                    candidates.append( (score, ob) ) 
+                    nfound = nfound + 1
+                    if nfound == maxCandidates : 
+                        break
     candidates.sort() 
     candidates.reverse() 
     dbg_p("### Candidates: ", candidates)
-    for cand in candidates: 
-        (score, ((s1, v1),(s2,v2))) = cand
-        old_v1 = testcase[ s1 ]
-        testcase[ s1 ] = v1
-        old_v2 = testcase[ s2 ]
-        testcase[ s2 ] = v2
-        if completeCase( columnOrder[1:] , testcase ): 
-            return True
-        else: 
-            dbg_p("#DBG *** Rolling back ", s1, s2)
-            # Restore previous values
-            testcase[ s1 ] = old_v1
-            testcase[ s2 ] = old_v2
+    choices = [ PairItems[ob] for (score, ob) in candidates ]
     ## If we couldn't score any more obligations, can we at least
     ## fill in some compatible value and move on? 
-    dbg_p("#DBG *** Trying any value, regardless of obligation")
-    for val in CategoriesValues[ col ] : 
-        if compatible((col,val), testcase) :
-            testcase[ col ] = val
-            if completeCase( columnOrder[1:], testcase ): 
-                return True
-            else: 
-                testcase[ col ] = DontCare
-    dbg_p("#DBG ** Failing to fill column ", col , " with ", testcase)
+    ## (col is DontCare, so being compatible comes down to Forbidden)
+    choices.extend( [ (item, item) for item in ColumnItems[ col ] 
+                      if not Forbidden[ item ] ] )
+    return choices
+
+#
+# Depth-first search for values of the DontCare columns of testcase, 
+# taken in columnOrder.  The search keeps its own stack, indexed by 
+# depth in columnOrder: the choices for that column (None if the 
+# column has not been reached yet), the next one to try, and what to 
+# restore to roll back the one in place.  Since every change is 
+# rolled back before the next choice at the same depth is tried, 
+# the choices can be worked out once, when the column is reached. 
+#
+def completeCase( columnOrder, testcase ) : 
+    ncols = len(columnOrder)
+    choices = [ None ] * ncols
+    nextChoice = [ 0 ] * ncols
+    undo = [ None ] * ncols
+    depth = 0
+    while depth >= 0 : 
+        if depth == ncols : 
+            dbg_p("#DBG: *** Success: ", testcase)
+            return True
+        col = columnOrder[depth]
+        if choices[depth] is None : 
+            dbg_p("#DBG * Attempting to complete", testcase )
+            if testcase[col] != DontCareId: 
+                dbg_p("#DBG *  Skipping column ", col, " (already filled in)")
+                ## Nothing to try here if we come back
+                choices[depth] = [ ]
+                depth = depth + 1
+                continue
+            dbg("#DBG ***Trying column ", col, " in ",  testcase)
+            choices[depth] = columnChoices( col, testcase )
+            nextChoice[depth] = 0
+        elif undo[depth] is not None : 
+            dbg_p("#DBG *** Rolling back ", col)
+            # Restore previous values, last change first
+            (s1, old_v1, s2, old_v2) = undo[depth]
+            setSlot( testcase, s2, old_v2 )
+            setSlot( testcase, s1, old_v1 )
+            undo[depth] = None
+        i = nextChoice[depth]
+        if i < len(choices[depth]) : 
+            (k1, k2) = choices[depth][i]
+            nextChoice[depth] = i + 1
+            s1 = ItemSlots[k1]
+            s2 = ItemSlots[k2]
+            old_v1 = setSlot( testcase, s1, k1 )
+            old_v2 = setSlot( testcase, s2, k2 )
+            undo[depth] = (s1, old_v1, s2, old_v2)
+            depth = depth + 1
+        else : 
+            dbg_p("#DBG ** Failing to fill column ", col , " with ", testcase)
+            choices[depth] = None
+            depth = depth - 1
     return False
 	    
 # ------------------------------------------------------------
@@ -606,10 +959,11 @@ def CaseMessage( msg, vector, dest=sys.stderr ) :
     print_( "{} [".format(msg), end="", file=dest)
     sep=""
     for col in range(len(vector)) : 
-            if vector[col] == DontCare :
+            if vector[col] == DontCareId :
                 print_(sep+"_",end="", file=dest)
             else: 
-                print_("{}{}={}".format(sep,CategoriesList[col],vector[col]),
+                print_("{}{}={}".format(sep,CategoriesList[col],
+                                        ItemValues[vector[col]]),
                            end="", file=dest)
             sep=", "
     print_("]",file=dest)
@@ -617,10 +971,9 @@ def CaseMessage( msg, vector, dest=sys.stderr ) :
 def ObToVector( ob ) : 
     """Convert obligation to vector for debugging messages"""
     t = MakeTuple( NCol ) 
-    s1,v1 = ob[0]
-    s2,v2 = ob[1]
-    t[s1]=v1
-    t[s2]=v2
+    k1, k2 = PairItems[ob]
+    t[ItemSlots[k1]]=k1
+    t[ItemSlots[k2]]=k2
     return t
     
 
@@ -643,7 +996,7 @@ def PrintAsText( columns, descriptive_title ):
     print_("_"*60)
     for t in Suite : 
         for slot in columns : 
-            value =  t[slot]
+            value =  ItemValues[ t[slot] ]
             print_("%15s" % value , end="")
         print_( "" )
     print_( "" )
@@ -657,9 +1010,8 @@ def PrintAsCSV(columns):
     for slot in columns : 
         schema_row.append( CategoriesList[slot] )
     csv_writer.writerow(schema_row)
-    for t in Suite : 
-        dbg("write row " , t )
-        csv_writer.writerow( t ) 
+    csv_writer.writerows( [ [ ItemValues[t[slot]] for slot in columns ]
+                            for t in Suite ] )
 
 # ----------------
 
@@ -706,7 +1058,9 @@ def initial_suite_clear( initial_suite ) :
             trvec = MakeTuple(len(CategoriesList))
             for i in range(len(vec)) : 
                 if in_schema_map[i] != -1 : 
-                    trvec[in_schema_map[i]] = vec[i]
+                    ## Values not in the specification cover nothing
+                    col = in_schema_map[i]
+                    trvec[col] = ItemIds.get( (col, vec[i]), DontCareId )
             clearObligations( trvec ) 
         else: 
             print_("*** Warning, format mismatch with initial suite ", 
@@ -720,10 +1074,13 @@ def initial_suite_clear( initial_suite ) :
 ## we are trying to see what is missing in an initial test suite. 
 ## 
 def print_required_pairs( ) : 
-    for ob in Outstanding : 
-        s1, v1 = ob[0]
+    for pair in range(len(PairItems)) : 
+        if not Outstanding[pair] : 
+            continue
+        (k1, k2) = PairItems[pair]
+        s1, v1 = ItemSlots[k1], ItemValues[k1]
         name1=CategoriesList[s1]
-        s2, v2 = ob[1]
+        s2, v2 = ItemSlots[k2], ItemValues[k2]
         name2=CategoriesList[s2]
         print_("%s=%s, %s=%s" % (name1, v1, name2, v2))
 
@@ -732,52 +1089,66 @@ def print_required_pairs( ) :
 ## MAIN PROGRAM (after initialization above)
 ## ------------------------------------------------------------
 
+def main(): 
+    global UserOptions, UserArgs, DBG 
+    (UserOptions, UserArgs) = optparser.parse_args()
+    Log.info("User options: ",  UserOptions)
+    if UserOptions.debug :
+        print_("Enabling debugging")
+        DBG=True
+        Log.setLevel(logging.DEBUG)
+
+    # -- Respond to special diagnostic options -- 
+
+    if UserOptions.license: 
+        print_(License)
+        sys.exit(0)
+
+    if UserOptions.debug: 
+        print_("---------------------------")
+        print_("Options in effect: ")
+        print_("debug: ", UserOptions.debug)
+        print_("output_format:", UserOptions.output_format)
+        print_("varying:", UserOptions.varying)
+        print_("combinations:", UserOptions.combinations)
+        print_("singles:", UserOptions.singles)
+        print_("initial_suite:", UserOptions.initial_suite)
+        print_("pairs:", UserOptions.pairs)
+        print_("jobs:", UserOptions.jobs)
+        print_("---------------------------")
+
+
+    # -- Main processing: Parse the script, execute, print -- 
+
+    parse() 
+    identifySingles() 
+    makeExcludes()
+    makeObligations()
+
+    for suite in UserOptions.initial_suite : 
+        initial_suite_clear( suite ) 
+
+
+    if UserOptions.pairs : 
+        print_("=== Pairs required for completion ===" )
+        print_required_pairs() 
+        print_("=====================================")
+
+    if UserOptions.combinations : 
+        if UserOptions.jobs > 1 : 
+            CreateCasesInParallel( UserOptions.jobs )
+        else: 
+            while CreateCase() : 
+                pass
+        if UserOptions.varying : 
+            PrintTable( MultipleColumns, "Pairwise coverage, varying columns only" )
+        else: 
+            PrintTable( range(len(CategoriesList)), "Pairwise coverage" ) 
 
-# -- Respond to special diagnostic options -- 
-
-if UserOptions.license: 
-    print_(License)
-    exit(0)
-
-if UserOptions.debug: 
-    print_("---------------------------")
-    print_("Options in effect: ")
-    print_("debug: ", UserOptions.debug)
-    print_("output_format:", UserOptions.output_format)
-    print_("varying:", UserOptions.varying)
-    print_("combinations:", UserOptions.combinations)
-    print_("singles:", UserOptions.singles)
-    print_("initial_suite:", UserOptions.initial_suite)
-    print_("pairs:", UserOptions.pairs)
-    print_("---------------------------")
-
-
-# -- Main processing: Parse the script, execute, print -- 
-
-parse() 
-identifySingles() 
-makeExcludes()
-makeObligations()
-
-for suite in UserOptions.initial_suite : 
-    initial_suite_clear( suite ) 
-
-
-if UserOptions.pairs : 
-    print_("=== Pairs required for completion ===" )
-    print_required_pairs() 
-    print_("=====================================")
-
-if UserOptions.combinations : 
-    while len(ObsList) > 0 : 
-        CreateCase()
-    if UserOptions.varying : 
-        PrintTable( MultipleColumns, "Pairwise coverage, varying columns only" )
-    else: 
-        PrintTable( range(len(CategoriesList)), "Pairwise coverage" ) 
-
-if UserOptions.singles : 
-    Suite = [ ] 
-    CreateSingles() 
-    PrintTable( range(len(CategoriesList)), "Single and error vectors" ) 
+    if UserOptions.singles : 
+        del Suite[:] 
+        CreateSingles() 
+        PrintTable( range(len(CategoriesList)), "Single and error vectors" ) 
 
+if __name__ == "__main__" : 
+    main()
@@ -0,0 +1,53 @@
+#
+# Check that test suites built with --jobs still cover every pair.
+# Run from the top of the repository, with
+#     python tests/test_jobs.py
+# (or under pytest).  The required pairs are the ones genpairs
+# itself reports with -p before it builds any test cases.
+#
+
+import csv
+import os
+import subprocess
+import sys
+
+Here = os.path.dirname( os.path.abspath( __file__ ) )
+GenPairs = os.path.join( Here, "..", "genpairs.py" )
+## Specifications in which every obligation can be met
+Specs = [ os.path.join( Here, "..", "examples", "teams.cp" ) ]
+
+def run_genpairs( spec, *args ):
+    cmd = [ sys.executable, GenPairs ] + list(args)
+    proc = subprocess.Popen( cmd, stdin=open(spec),
+                             stdout=subprocess.PIPE,
+                             universal_newlines=True )
+    out = proc.communicate()[0]
+    assert proc.returncode == 0, "genpairs failed on " + spec
+    return out.splitlines()
+
+def uncovered_pairs( spec, jobs ):
+    """Pairs that genpairs requires but no test case covers"""
+    lines = run_genpairs( spec, "-p", "-c", "-o", "-j", str(jobs) )
+    end = lines.index( "=====================================" )
+    required = set()
+    for line in lines[1:end] :
+        (first, second) = line.split( ", " )
+        required.add( (tuple(first.split( "=" )), tuple(second.split( "=" ))) )
+    rows = list( csv.reader( lines[end+1:] ) )
+    schema = rows[0]
+    for row in rows[1:] :
+        items = list( zip( schema, row ) )
+        for i in range( len(items) ) :
+            for j in range( i+1, len(items) ) :
+                required.discard( (items[i], items[j]) )
+    return required
+
+def test_jobs_cover_all_pairs():
+    for spec in Specs :
+        for jobs in [ 1, 2 ] :
+            missing = uncovered_pairs( spec, jobs )
+            assert not missing, "%s -j %d misses %s" % (spec, jobs, missing)
+
+if __name__ == "__main__" :
+    test_jobs_cover_all_pairs()
+    print( "OK" )
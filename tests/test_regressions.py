@@ -0,0 +1,49 @@
+#
+# Regression checks for specifications that have tripped up genpairs.
+# Run from the top of the repository, with
+#     python tests/test_regressions.py
+# (or under pytest).
+#
+
+import csv
+import os
+import subprocess
+import sys
+
+Here = os.path.dirname( os.path.abspath( __file__ ) )
+GenPairs = os.path.join( Here, "..", "genpairs.py" )
+Inconsistent = os.path.join( Here, "..", "examples", "inconsistent.cp" )
+
+## A value listed twice in a category is still just one value
+Repeated = "x:\n a\n a\n b\ny:\n c\n d\n"
+
+def run_genpairs( spec, *args ):
+    cmd = [ sys.executable, GenPairs ] + list(args)
+    proc = subprocess.Popen( cmd, stdin=subprocess.PIPE,
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE,
+                             universal_newlines=True )
+    out = proc.communicate( spec )[0]
+    assert proc.returncode == 0, "genpairs %s failed" % " ".join(args)
+    return out.splitlines()
+
+def test_repeated_value():
+    for jobs in [ "1", "2" ] :
+        rows = list( csv.reader( run_genpairs( Repeated, "-c", "-o",
+                                               "-j", jobs ) ) )
+        cases = sorted( tuple(row) for row in rows[1:] )
+        assert cases == [ ("a", "c"), ("a", "d"), ("b", "c"), ("b", "d") ], \
+               "-j %s gave %s" % (jobs, cases)
+
+def test_inconsistent_singles():
+    ## The expected output at the end of examples/inconsistent.cp
+    spec = open( Inconsistent ).read()
+    for jobs in [ "1", "2" ] :
+        rows = [ line.split() for line in run_genpairs( spec, "-j", jobs ) ]
+        assert [ "e0", "v1.1", "v2.0" ] in rows, "-j %s gave %s" % (jobs, rows)
+        assert [ "e1", "v1.1", "v2.0" ] in rows, "-j %s gave %s" % (jobs, rows)
+
+if __name__ == "__main__" :
+    test_repeated_value()
+    test_inconsistent_singles()
+    print( "OK" )